@@ -1,41 +1,243 @@
 """
-AI-Powered Cover Letter Generator using GPT-4o
+AI-Powered Cover Letter Generator using OpenAI models
 """
 
 import os
-from typing import Optional
-from openai import OpenAI
+import asyncio
+import functools
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Callable, ClassVar, List, Optional, Tuple, Union
+import httpx
+from openai import AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
-import PyPDF2
+import pymupdf
+import tiktoken
+
+
+# Directory where extracted PDF text is cached, keyed by the PDF's content hash
+PDF_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cover_letter_gen")
+
+
+# Shared OpenAI client so repeated generators reuse pooled keep-alive connections
+_CLIENT: Optional[OpenAI] = None
+_CLIENT_API_KEY: Optional[str] = None
+
+
+def _get_client(api_key: str) -> OpenAI:
+    """
+    Return the shared OpenAI client, creating it on first use.
+    
+    Args:
+        api_key: OpenAI API key
+        
+    Returns:
+        OpenAI client backed by a pooled HTTP connection
+    """
+    global _CLIENT, _CLIENT_API_KEY
+    if _CLIENT is None or _CLIENT_API_KEY != api_key:
+        _CLIENT = OpenAI(
+            api_key=api_key,
+            http_client=httpx.Client(
+                limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60)
+            )
+        )
+        _CLIENT_API_KEY = api_key
+    return _CLIENT
+
+
+@functools.lru_cache(maxsize=1)
+def _ensure_env():
+    """Load environment variables from .env, only once per process."""
+    load_dotenv()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_encoder(model: str) -> "tiktoken.Encoding":
+    """
+    Return the tokenizer for a model, loading it only once per process.
+    
+    Args:
+        model: OpenAI model name
+        
+    Returns:
+        tiktoken encoding for the model
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Unknown model names fall back to the GPT-4o family encoding
+        return tiktoken.get_encoding("o200k_base")
+
+
+class TokenBucket:
+    """Limits the number of tokens (or, charged one per call, requests) sent to the OpenAI API per minute."""
+    
+    def __init__(self, tokens_per_minute: int):
+        """
+        Initialize a full bucket.
+        
+        Args:
+            tokens_per_minute: Token budget refilled every minute, at least 1
+        """
+        if tokens_per_minute < 1:
+            raise ValueError(f"tokens_per_minute must be at least 1, got {tokens_per_minute}")
+        self.capacity = tokens_per_minute
+        self.tokens = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _take(self, n: int) -> float:
+        """
+        Take n tokens if available.
+        
+        Args:
+            n: Number of tokens needed
+            
+        Returns:
+            0 if the tokens were taken, otherwise seconds to wait before retrying
+        """
+        # A single request larger than the whole budget only waits for a full bucket
+        n = min(n, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= n:
+                self.tokens -= n
+                return 0.0
+            return (n - self.tokens) / self.rate
+    
+    def acquire(self, n: int):
+        """Block until n tokens are available and take them."""
+        wait = self._take(n)
+        while wait > 0:
+            time.sleep(wait)
+            wait = self._take(n)
+    
+    async def acquire_async(self, n: int):
+        """Wait without blocking the event loop until n tokens are available and take them."""
+        wait = self._take(n)
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self._take(n)
 
 
 class CoverLetterGenerator:
-    """Generates cover letters using GPT-4o based on resume and job description."""
+    """Generates cover letters using OpenAI models based on resume and job description."""
+    
+    # Upper bound on generated tokens per cover letter
+    MAX_OUTPUT_TOKENS: ClassVar[int] = 600
     
-    def __init__(self, contact_info: Optional[dict] = None):
+    # Prompt template, specialized with contact details once per instance.
+    # Braces meant to reach the model literally are escaped for both format passes.
+    _PROMPT_TEMPLATE: ClassVar[str] = """Write a great cover letter for this job description. Use what you already know from my resume to highlight my most relevant experiences and skills. Make sure the tone is very humanized, natural, and conversational rather than sounding like a typical AI-generated text. Avoid em dashes and odd punctuation. Keep it professional but approachable, with a strong narrative that shows why I'm a good fit. Do not use any placeholders or bracketed fields of any kind (no [], <>, {{{{}}}}, ALL CAPS prompts like INSERT/ADD HERE, or 'to be filled later'). Provide fully realized, final content with no TODOs or TBDs.
+
+End the letter with the following four separate lines:
+Email: {email}
+Phone: {phone}
+LinkedIn: {linkedin}
+Website: {website}
+
+RESUME:
+{resume}
+
+JOB DESCRIPTION:
+{job_description}
+
+Please generate the complete cover letter text only, without any additional explanations or formatting instructions.
+**IMPORTANT**
+- NO em dashes
+- Do not emphsize on my education and instead try to make it sound like I'm a good fit for the job using my experiences and skills.
+- Usually the companies don't care about my GPA.
+- If in the job description you detect a certain challenge they are facing, try to highlight how my experiences and skills can help them overcome that challenge.
+- Limit the letter to 300-350 words total.
+"""
+    
+    def __init__(
+        self,
+        contact_info: Optional[dict] = None,
+        force_refresh: bool = False,
+        tokens_per_minute: Optional[int] = None,
+        warm: bool = False,
+        max_pdf_pages: int = 4,
+        requests_per_minute: Optional[int] = None
+    ):
         """
         Initialize the cover letter generator with OpenAI client.
         
         Args:
             contact_info: Dictionary with 'email', 'phone', 'linkedin' keys.
                          If None, will try to load from environment variables.
+            force_refresh: If True, re-parse PDFs instead of using cached text.
+            tokens_per_minute: Optional token budget per minute. When set, requests
+                               wait for budget instead of hitting rate limit errors.
+            warm: If True, open the API connection in the background so the first
+                  request does not pay connection setup latency.
+            max_pdf_pages: Maximum number of pages to extract from PDF inputs, the resume
+                           and any PDF job description alike.
+            requests_per_minute: Optional request budget per minute. When set, requests
+                                 wait for budget instead of hitting rate limit errors.
         """
         # Load environment variables
-        load_dotenv()
+        _ensure_env()
         
         # Get OpenAI API key from environment
         api_key = os.getenv('OPENAI_API_KEY')
         if not api_key:
             raise ValueError("OPENAI_API_KEY not found in environment variables. Please set it in your .env file.")
         
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=api_key)
+        # Reuse the shared OpenAI client
+        self.client = _get_client(api_key)
+        
+        # Async clients are bound to an event loop, so one is created per batch
+        self._api_key = api_key
         
         # Default model
-        self.default_model = "gpt-4o"
+        self.default_model = "gpt-4o-mini"
         
         # Set up contact information
         self.contact_info = self._setup_contact_info(contact_info)
+        
+        # Fill in contact details now so each prompt only needs the resume and job description
+        self._prompt_template = self._PROMPT_TEMPLATE.format(
+            **{key: self._escape_braces(self.contact_info[key]) for key in ('email', 'phone', 'linkedin', 'website')},
+            resume="{resume}",
+            job_description="{job_description}"
+        )
+        
+        # Whether to bypass the extracted PDF text cache
+        self.force_refresh = force_refresh
+        
+        # Only the first pages of a PDF are read, resumes rarely need more
+        if max_pdf_pages < 1:
+            raise ValueError(f"max_pdf_pages must be at least 1, got {max_pdf_pages}")
+        self.max_pdf_pages = max_pdf_pages
+        
+        # Token budget shared by all requests from this generator
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute is not None else None
+        
+        # Load the tokenizer once, up front, so a failed download shows up here and
+        # not inside every request. Without it, token counts are roughly estimated.
+        self._encoder = self._load_encoder(self.default_model) if self.token_bucket else None
+        
+        # Request budget, a second bucket charged one unit per request
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute is not None else None
+        
+        # Prime the pooled connection while the caller reads the resume and job description
+        if warm:
+            threading.Thread(target=self._warm_up, daemon=True).start()
+    
+    def _warm_up(self):
+        """Make a lightweight API request to establish the keep-alive connection."""
+        try:
+            self.client.models.retrieve(self.default_model)
+        except Exception:
+            # Warm-up is best effort, the real request reports any errors
+            pass
     
     def _setup_contact_info(self, contact_info: Optional[dict]) -> dict:
         """
@@ -62,105 +264,340 @@ class CoverLetterGenerator:
     
     def generate_with_ai(
         self, 
-        resume: str, 
-        job_description: str, 
-        model: Optional[str] = None
+        resume: Union[str, Path], 
+        job_description: Union[str, Path], 
+        model: Optional[str] = None,
+        on_delta: Optional[Callable[[str], None]] = None
     ) -> str:
         """
-        Generate a cover letter using GPT-4o based on resume and job description.
+        Generate a cover letter using an OpenAI model based on resume and job description.
+        
+        The completion is streamed, so callers can show the letter while it is
+        still being written instead of waiting for the full response.
         
         Args:
-            resume: Resume text or file path
-            job_description: Job description text or file path
+            resume: Resume text, or a Path to a resume file (a str is never read as a path)
+            job_description: Job description text, or a Path to a job description file (a str is never read as a path)
             model: OpenAI model to use
+            on_delta: Optional callback invoked with each chunk of text as it arrives
             
         Returns:
             Generated cover letter text
         """
-        # Read files if paths are provided
-        resume_text = self._read_file_or_text(resume)
-        job_desc_text = self._read_file_or_text(job_description)
-        
-        # Use default model if none specified
-        model = model or self.default_model
-        
-        # Create the prompt for GPT-4o
-        prompt = self._create_prompt(resume_text, job_desc_text)
+        model, prompt = self._prepare_request(resume, job_description, model)
         
         try:
+            if self.request_bucket:
+                self.request_bucket.acquire(1)
+            if self.token_bucket:
+                self.token_bucket.acquire(self._estimate_tokens(prompt))
+            
             # Generate cover letter using OpenAI API
             response = self.client.chat.completions.create(
                 model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert cover letter writer who creates natural, humanized, and conversational cover letters."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+                messages=self._build_messages(prompt),
                 temperature=0.7,
-                max_tokens=1000
+                max_tokens=self.MAX_OUTPUT_TOKENS,
+                stream=True
             )
             
+            # Collect streamed chunks, forwarding each one as it arrives
+            parts = []
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    if on_delta:
+                        on_delta(delta)
+            
+            cover_letter = "".join(parts).strip()
+            return cover_letter
+            
+        except Exception as e:
+            raise Exception(f"Error generating cover letter with OpenAI: {str(e)}")
+    
+    async def generate_with_ai_async(
+        self,
+        resume: Union[str, Path],
+        job_description: Union[str, Path],
+        model: Optional[str] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        client: Optional[AsyncOpenAI] = None
+    ) -> str:
+        """
+        Generate a cover letter asynchronously, for use in batch runs.
+        
+        Args:
+            resume: Resume text, or a Path to a resume file (a str is never read as a path)
+            job_description: Job description text, or a Path to a job description file (a str is never read as a path)
+            model: OpenAI model to use
+            semaphore: Optional semaphore bounding the number of in-flight requests
+            client: Async client to send the request with. If None, a client is
+                    created for this call and closed when it completes.
+            
+        Returns:
+            Generated cover letter text
+        """
+        if client is None:
+            async with self._create_async_client() as client:
+                return await self.generate_with_ai_async(resume, job_description, model, semaphore, client)
+        
+        model, prompt = self._prepare_request(resume, job_description, model)
+        
+        try:
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(1)
+            async with semaphore:
+                if self.request_bucket:
+                    await self.request_bucket.acquire_async(1)
+                if self.token_bucket:
+                    await self.token_bucket.acquire_async(self._estimate_tokens(prompt))
+                
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=self._build_messages(prompt),
+                    temperature=0.7,
+                    max_tokens=self.MAX_OUTPUT_TOKENS
+                )
+            
             cover_letter = response.choices[0].message.content.strip()
             return cover_letter
             
         except Exception as e:
             raise Exception(f"Error generating cover letter with OpenAI: {str(e)}")
     
-    def _read_file_or_text(self, input_data: str) -> str:
+    async def generate_batch_async(
+        self,
+        resume: Union[str, Path],
+        job_descriptions: List[Union[str, Path]],
+        model: Optional[str] = None,
+        max_concurrent_requests: int = 5
+    ) -> List[Union[str, BaseException]]:
+        """
+        Generate one cover letter per job description concurrently.
+        
+        A failure for one job description does not cancel the others.
+        
+        Args:
+            resume: Resume text, or a Path to a resume file, read once for the whole batch
+            job_descriptions: Job description texts, or Paths to job description files
+            model: OpenAI model to use
+            max_concurrent_requests: Maximum number of requests in flight at once
+            
+        Returns:
+            Generated cover letters, in the same order as job_descriptions. Entries
+            that failed hold the exception raised instead of the letter.
+        """
+        resume_text = self._read_file_or_text(resume)
+        semaphore = asyncio.Semaphore(max_concurrent_requests)
+        
+        # One pooled client for the whole batch, closed before the event loop ends
+        async with self._create_async_client() as client:
+            return await asyncio.gather(*[
+                self.generate_with_ai_async(resume_text, job_description, model, semaphore, client)
+                for job_description in job_descriptions
+            ], return_exceptions=True)
+    
+    def _create_async_client(self) -> AsyncOpenAI:
         """
-        Read content from file if path is provided, otherwise return the text.
+        Create an async client with the same keep-alive pooling as the shared sync client.
+        
+        The client is bound to the running event loop, so callers should close it
+        with async with before the loop ends.
+        
+        Returns:
+            New AsyncOpenAI client
+        """
+        return AsyncOpenAI(
+            api_key=self._api_key,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60)
+            )
+        )
+    
+    def _prepare_request(
+        self,
+        resume: Union[str, Path],
+        job_description: Union[str, Path],
+        model: Optional[str]
+    ) -> Tuple[str, str]:
+        """
+        Resolve the inputs, model and prompt shared by the sync and async generators.
+        
+        Args:
+            resume: Resume text, or a Path to a resume file (a str is never read as a path)
+            job_description: Job description text, or a Path to a job description file (a str is never read as a path)
+            model: OpenAI model to use, or None for the default
+            
+        Returns:
+            Tuple of (model, prompt)
+        """
+        # Read files if paths are provided
+        resume_text = self._read_file_or_text(resume)
+        job_desc_text = self._read_file_or_text(job_description)
+        
+        # Use default model if none specified
+        model = model or self.default_model
+        
+        # Create the prompt for the model
+        return model, self._create_prompt(resume_text, job_desc_text)
+    
+    @staticmethod
+    def _load_encoder(model: str) -> Optional["tiktoken.Encoding"]:
+        """
+        Load the tokenizer for a model, or None if it cannot be loaded.
+        
+        tiktoken downloads its encoding files on first use, which can fail
+        when that host is unreachable even though the API itself is not.
+        
+        Args:
+            model: OpenAI model name
+            
+        Returns:
+            tiktoken encoding, or None to fall back to a rough estimate
+        """
+        try:
+            return _get_encoder(model)
+        except Exception as e:
+            print(f"Warning: could not load tokenizer ({e}), estimating token counts from text length")
+            return None
+    
+    def _estimate_tokens(self, prompt: str) -> int:
+        """
+        Estimate the tokens a request counts against the rate limit.
+        
+        The API reserves max_tokens for the completion up front, so it is
+        included along with the prompt tokens. Prompt tokens are counted with
+        the tokenizer loaded at construction, or estimated as 4 characters per
+        token if it could not be loaded.
+        
+        Args:
+            prompt: User prompt for the cover letter
+            
+        Returns:
+            Estimated token count for the request
+        """
+        contents = [message["content"] for message in self._build_messages(prompt)]
+        if self._encoder is not None:
+            prompt_tokens = sum(len(self._encoder.encode(content)) for content in contents)
+        else:
+            prompt_tokens = sum(len(content) // 4 for content in contents)
+        return prompt_tokens + self.MAX_OUTPUT_TOKENS
+    
+    def _build_messages(self, prompt: str) -> List[dict]:
+        """
+        Build the chat messages sent to the OpenAI API.
+        
+        Args:
+            prompt: User prompt for the cover letter
+            
+        Returns:
+            List of chat messages
+        """
+        return [
+            {
+                "role": "system",
+                "content": "You are an expert cover letter writer who creates natural, humanized, and conversational cover letters."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    
+    def _read_file_or_text(self, input_data: Union[str, Path]) -> str:
+        """
+        Read content from file if a Path is provided, otherwise return the text.
         Supports PDF files and text files.
         
+        A str is always treated as text, never as a file path. Since this used to
+        accept file paths as strings, a short single-line str naming an existing
+        file is rejected rather than sent to the model as literal text.
+        
         Args:
-            input_data: File path or text content
+            input_data: Path to a file, or text content as a string
             
         Returns:
             Content as string
+            
+        Raises:
+            ValueError: If a str looks like the path of an existing file
         """
-        if os.path.isfile(input_data):
-            try:
-                # Check if it's a PDF file
-                if input_data.lower().endswith('.pdf'):
-                    return self._read_pdf_file(input_data)
-                else:
-                    # Read as text file
-                    with open(input_data, 'r', encoding='utf-8') as f:
-                        return f.read()
-            except Exception as e:
-                raise Exception(f"Error reading file {input_data}: {str(e)}")
-        else:
+        if not isinstance(input_data, Path):
+            if len(input_data) < 4096 and '\n' not in input_data and os.path.isfile(input_data):
+                raise ValueError(
+                    f"{input_data!r} is a file path passed as a str, which is treated as text. "
+                    f"Pass Path({input_data!r}) to read the file."
+                )
             return input_data
+        
+        try:
+            # Check if it's a PDF file
+            if input_data.suffix.lower() == '.pdf':
+                return self._read_pdf_file(input_data)
+            else:
+                # Read as text file
+                return input_data.read_text(encoding='utf-8')
+        except Exception as e:
+            raise Exception(f"Error reading file {input_data}: {str(e)}")
     
-    def _read_pdf_file(self, pdf_path: str) -> str:
+    def _read_pdf_file(self, pdf_path: Union[str, Path], max_pages: Optional[int] = None) -> str:
         """
-        Read text content from a PDF file.
+        Read text content from the first pages of a PDF file.
+        
+        Extracted text is cached on disk keyed by the file's hash, so an
+        unchanged resume is only parsed once.
         
         Args:
             pdf_path: Path to the PDF file
+            max_pages: Maximum number of pages to read (default: self.max_pdf_pages)
             
         Returns:
             Extracted text content
         """
+        if max_pages is None:
+            max_pages = self.max_pdf_pages
+        if max_pages < 1:
+            raise ValueError(f"max_pages must be at least 1, got {max_pages}")
+        
         try:
+            # Load the whole PDF into memory once, for both hashing and parsing
             with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text.strip()
+                data = file.read()
+            digest = hashlib.md5(data).hexdigest()
+            cache_path = os.path.join(PDF_CACHE_DIR, f"{digest}_{max_pages}.txt")
+            
+            # Return cached text if this exact PDF was parsed before
+            if not self.force_refresh and os.path.isfile(cache_path):
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    return f.read()
+            
+            doc = pymupdf.open(stream=data, filetype="pdf")
+            try:
+                parts = [doc[i].get_text("text") for i in range(min(doc.page_count, max_pages))]
+            finally:
+                doc.close()
+            text = "\n".join(parts).strip()
+            
+            # Caching is best effort, a failed write must not break reading
+            try:
+                os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+                with open(cache_path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+            except OSError:
+                pass
+            
+            return text
         except ImportError:
-            raise Exception("PyPDF2 is required to read PDF files. Please install it with: pip install PyPDF2")
+            raise Exception("PyMuPDF is required to read PDF files. Please install it with: pip install pymupdf")
         except Exception as e:
             raise Exception(f"Error reading PDF file {pdf_path}: {str(e)}")
     
     def _create_prompt(self, resume: str, job_description: str) -> str:
         """
-        Create a comprehensive prompt for GPT-4o using the user's specific instructions.
+        Create a comprehensive prompt for the model using the user's specific instructions.
         
         Args:
             resume: Resume content
@@ -169,29 +606,12 @@ class CoverLetterGenerator:
         Returns:
             Formatted prompt string
         """
-        prompt = f"""Write a great cover letter for this job description. Use what you already know from my resume to highlight my most relevant experiences and skills. Make sure the tone is very humanized, natural, and conversational rather than sounding like a typical AI-generated text. Avoid em dashes and odd punctuation. Keep it professional but approachable, with a strong narrative that shows why I'm a good fit. Do not use any placeholders or bracketed fields of any kind (no [], <>, {{}}, ALL CAPS prompts like INSERT/ADD HERE, or 'to be filled later'). Provide fully realized, final content with no TODOs or TBDs.
-
-End the letter with the following four separate lines:
-Email: {self.contact_info['email']}
-Phone: {self.contact_info['phone']}
-LinkedIn: {self.contact_info['linkedin']}
-Website: {self.contact_info['website']}
-
-RESUME:
-{resume}
-
-JOB DESCRIPTION:
-{job_description}
-
-Please generate the complete cover letter text only, without any additional explanations or formatting instructions.
-**IMPORTANT**
-- NO em dashes
-- Do not emphsize on my education and instead try to make it sound like I'm a good fit for the job using my experiences and skills.
-- Usually the companies don't care about my GPA.
-- If in the job description you detect a certain challenge they are facing, try to highlight how my experiences and skills can help them overcome that challenge.
-"""
-
-        return prompt
+        return self._prompt_template.format(resume=resume, job_description=job_description)
+    
+    @staticmethod
+    def _escape_braces(value) -> str:
+        """Escape braces so a value of any type survives a later str.format call unchanged."""
+        return str(value).replace('{', '{{').replace('}', '}}')
     
     def set_model(self, model: str):
         """Set the default OpenAI model to use."""
@@ -4,24 +4,108 @@ AI-Powered Cover Letter Generator - Main Entry Point
 """
 
 import argparse
+import asyncio
+import contextlib
+import itertools
+import re
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 from cover_letter_generator import CoverLetterGenerator
 from datetime import datetime
+from pathlib import Path
 
 
-def create_pdf_cover_letter(cover_letter_text, output_filename="coverLetter.pdf"):
+# Root directory for all generated output
+OUTPUT_ROOT = Path("coverletters")
+
+# Models selected by --quality
+QUALITY_MODELS = {
+    "fast": "gpt-4o-mini",
+    "best": "gpt-4o",
+}
+
+try:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib.colors import HexColor
+    _HAS_REPORTLAB = True
+except ImportError:
+    _HAS_REPORTLAB = False
+
+try:
+    from docx import Document
+    from docx.shared import Inches, Pt, RGBColor
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    _HAS_DOCX = True
+except ImportError:
+    _HAS_DOCX = False
+
+
+# PDF paragraph styles, built once and shared by every render
+if _HAS_REPORTLAB:
+    _styles = getSampleStyleSheet()
+    
+    # Custom title style
+    TITLE_STYLE = ParagraphStyle(
+        'CustomTitle',
+        parent=_styles['Heading1'],
+        fontSize=17,
+        spaceAfter=10,
+        textColor=HexColor('#000000'),
+        alignment=1,  # Center alignment
+        fontName='Times-Bold'
+    )
+    
+    # Custom body style
+    BODY_STYLE = ParagraphStyle(
+        'CustomBody',
+        parent=_styles['Normal'],
+        fontSize=12,
+        spaceAfter=12,
+        leading=16,
+        fontName='Times-Roman'
+    )
+
+
+# Paragraph separator (a blank line, possibly containing whitespace)
+_PARAGRAPH_SPLIT = re.compile(r'\n\s*\n')
+
+# Keywords marking the contact information block at the end of the letter
+_CONTACT_KEYWORDS = re.compile(r'email:|phone:|linkedin:', re.IGNORECASE)
+
+
+def _segment(text):
+    """
+    Split cover letter text into (kind, text) segments shared by the renderers.
+    
+    kind is "para" for a regular paragraph or "contact_line" for a single line
+    of a multi-line contact information block.
+    """
+    segments = []
+    for para in _PARAGRAPH_SPLIT.split(text):
+        para = para.strip()
+        if not para:
+            continue
+        if '\n' in para and _CONTACT_KEYWORDS.search(para):
+            segments.extend(("contact_line", line.strip()) for line in para.split('\n') if line.strip())
+        else:
+            segments.append(("para", para))
+    return segments
+
+
+def create_pdf_cover_letter(cover_letter_text, output_filename="coverLetter.pdf", segments=None):
     """Create a beautiful PDF version of the cover letter."""
+    if not _HAS_REPORTLAB:
+        print("Warning: reportlab not installed. Install with: pip install reportlab")
+        return False
+    
     try:
-        from reportlab.lib.pagesizes import letter
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.lib.colors import HexColor
-        
         # Create PDF document with reduced top margin
         doc = SimpleDocTemplate(
-            output_filename,
+            str(output_filename),
             pagesize=letter,
             topMargin=0.5 * inch,
             bottomMargin=0.75 * inch,
@@ -30,70 +114,36 @@ def create_pdf_cover_letter(cover_letter_text, output_filename="coverLetter.pdf"
         )
         story = []
         
-        # Define styles
-        styles = getSampleStyleSheet()
-        
-        # Custom title style
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=17,
-            spaceAfter=10,
-            textColor=HexColor('#000000'),
-            alignment=1,  # Center alignment
-            fontName='Times-Bold'
-        )
-        
-        # Custom body style
-        body_style = ParagraphStyle(
-            'CustomBody',
-            parent=styles['Normal'],
-            fontSize=12,
-            spaceAfter=12,
-            leading=16,
-            fontName='Times-Roman'
-        )
-        
         # Add title
-        story.append(Paragraph("Cover Letter", title_style))
+        story.append(Paragraph("Cover Letter", TITLE_STYLE))
         story.append(Spacer(1, 6))
         
-        # Split cover letter into paragraphs and add them
-        paragraphs = cover_letter_text.split('\n\n')
-        for para in paragraphs:
-            if para.strip():
-                # Check if this paragraph contains contact information (multiple lines)
-                if '\n' in para and any(keyword in para.lower() for keyword in ['email:', 'phone:', 'linkedin:']):
-                    # Split contact info into separate lines and add each as a separate paragraph
-                    contact_lines = para.strip().split('\n')
-                    for line in contact_lines:
-                        if line.strip():
-                            story.append(Paragraph(line.strip(), body_style))
-                            story.append(Spacer(1, 6))  # Less spacing between contact lines
-                else:
-                    # Regular paragraph
-                    story.append(Paragraph(para.strip(), body_style))
-                    story.append(Spacer(1, 12))
+        # Add paragraphs, with each contact line as its own paragraph
+        if segments is None:
+            segments = _segment(cover_letter_text)
+        for kind, text in segments:
+            story.append(Paragraph(text, BODY_STYLE))
+            if kind == "contact_line":
+                story.append(Spacer(1, 6))  # Less spacing between contact lines
+            else:
+                story.append(Spacer(1, 12))
         
         # Build PDF
         doc.build(story)
         return True
         
-    except ImportError:
-        print("Warning: reportlab not installed. Install with: pip install reportlab")
-        return False
     except Exception as e:
         print(f"Error creating PDF: {e}")
         return False
 
 
-def create_pages_document(cover_letter_text, output_filename="coverLetter.docx"):
+def create_pages_document(cover_letter_text, output_filename="coverLetter.docx", segments=None):
     """Create a Pages-compatible document (.docx format)."""
+    if not _HAS_DOCX:
+        print("Warning: python-docx not installed. Install with: pip install python-docx")
+        return False
+    
     try:
-        from docx import Document
-        from docx.shared import Inches, Pt, RGBColor
-        from docx.enum.text import WD_ALIGN_PARAGRAPH
-        
         # Create document
         doc = Document()
         
@@ -117,11 +167,16 @@ def create_pages_document(cover_letter_text, output_filename="coverLetter.docx")
         # Add minimal spacing after title
         doc.add_paragraph()
         
-        # Split cover letter into paragraphs and add them
-        paragraphs = cover_letter_text.split('\n\n')
-        for para in paragraphs:
-            if para.strip():
-                p = doc.add_paragraph(para.strip())
+        # Add paragraphs, keeping consecutive contact lines together in one paragraph
+        if segments is None:
+            segments = _segment(cover_letter_text)
+        for kind, group in itertools.groupby(segments, key=lambda segment: segment[0]):
+            if kind == "contact_line":
+                paragraphs = ['\n'.join(text for _, text in group)]
+            else:
+                paragraphs = [text for _, text in group]
+            for para in paragraphs:
+                p = doc.add_paragraph(para)
                 p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
                 
                 # Style the paragraph
@@ -130,67 +185,199 @@ def create_pages_document(cover_letter_text, output_filename="coverLetter.docx")
                     run.font.size = Pt(12)
         
         # Save document
-        doc.save(output_filename)
+        doc.save(str(output_filename))
         return True
         
-    except ImportError:
-        print("Warning: python-docx not installed. Install with: pip install python-docx")
-        return False
     except Exception as e:
         print(f"Error creating Pages document: {e}")
         return False
 
 
+def positive_int(value):
+    """argparse type for integer options that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def as_input(value):
+    """Treat a command line argument as a file Path if it names one, otherwise as literal text."""
+    return Path(value) if os.path.isfile(value) else value
+
+
 def create_timestamped_directory():
     """Create a timestamped directory for this run's output files."""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_dir = os.path.join("coverletters", f"cover_letter_{timestamp}")
-    os.makedirs(output_dir, exist_ok=True)
+    # Microseconds keep directories unique for runs started within the same second
+    output_dir = OUTPUT_ROOT / f"cover_letter_{datetime.now():%Y%m%d_%H%M%S_%f}"
+    output_dir.mkdir(parents=True, exist_ok=True)
     return output_dir
 
 
+def generate_batch(generator, resume, jobs_dir, output_dir, model=None, no_pdf=False, no_docx=False,
+                   write_txt=False, max_concurrent_requests=5):
+    """
+    Generate one cover letter per job description file in jobs_dir concurrently.
+    
+    Letters that succeed are saved even if others fail. Returns the list of
+    (job file, error) pairs for the job descriptions that failed.
+    """
+    job_files = sorted(Path(jobs_dir).glob("*.txt"))
+    if not job_files:
+        raise FileNotFoundError(f"No job description files (*.txt) found in: {jobs_dir}")
+    
+    print(f"Generating {len(job_files)} cover letters...")
+    results = asyncio.run(generator.generate_batch_async(
+        resume=resume,
+        job_descriptions=job_files,
+        model=model,
+        max_concurrent_requests=max_concurrent_requests
+    ))
+    
+    # Save each letter under the name of its job description file
+    failures = []
+    for job_file, cover_letter in zip(job_files, results):
+        if isinstance(cover_letter, BaseException):
+            failures.append((job_file, cover_letter))
+            print(f"❌ Cover letter generation failed for {job_file}: {cover_letter}")
+            continue
+        
+        name = job_file.stem
+        segments = _segment(cover_letter)
+        if write_txt:
+            txt_filename = output_dir / f"{name}.txt"
+            with open(txt_filename, 'w') as f:
+                f.write(cover_letter)
+            print(f"Cover letter saved to {txt_filename}")
+        
+        if not no_pdf:
+            pdf_filename = output_dir / f"{name}.pdf"
+            if create_pdf_cover_letter(cover_letter, pdf_filename, segments):
+                print(f"✅ Beautiful PDF created: {pdf_filename}")
+            else:
+                print("❌ PDF generation failed")
+        
+        if not no_docx:
+            pages_filename = output_dir / f"{name}.docx"
+            if create_pages_document(cover_letter, pages_filename, segments):
+                print(f"✅ Pages document created: {pages_filename}")
+            else:
+                print("❌ Pages document generation failed")
+    
+    return failures
+
+
 def main():
     """Main function to handle command line arguments and generate cover letter."""
     parser = argparse.ArgumentParser(
-        description="Generate a cover letter based on a resume and job description using GPT-4o"
+        description="Generate a cover letter based on a resume and job description using OpenAI models "
+                    "(gpt-4o-mini by default, gpt-4o with --quality best)"
     )
     parser.add_argument(
         "resume",
         nargs='?',
         default="ArtinMajd_CV.pdf",
-        help="Resume text or path to file containing resume (default: Artin_Majd_CV.pdf)"
+        help="Resume text or path to file containing resume (default: ArtinMajd_CV.pdf)"
     )
     parser.add_argument(
         "job_description",
         nargs='?',
-        default="job_description.txt",
         help="Job description text or path to file containing job description (default: job_description.txt)"
     )
     parser.add_argument(
         "--output", "-o",
-        help="Output file path (default: cover_letter.txt)"
+        help="Output file name in the run directory; the PDF and DOCX reuse its base name, "
+             "and a non-PDF/DOCX name such as my_letter.txt also saves the text copy (default: coverLetter)"
     )
     parser.add_argument(
         "--model", "-m",
-        default="gpt-4o",
-        help="OpenAI model to use (default: gpt-4o)"
+        help="OpenAI model to use, overrides --quality"
+    )
+    parser.add_argument(
+        "--quality",
+        choices=sorted(QUALITY_MODELS),
+        default="fast",
+        help="fast uses gpt-4o-mini, best uses gpt-4o (default: fast)"
     )
     parser.add_argument(
         "--no-pdf",
         action="store_true",
         help="Skip PDF generation"
     )
+    parser.add_argument(
+        "--no-docx",
+        action="store_true",
+        help="Skip Pages document (.docx) generation"
+    )
+    parser.add_argument(
+        "--txt",
+        action="store_true",
+        help="Also save a .txt copy (always saved when both PDF and DOCX are skipped)"
+    )
     parser.add_argument(
         "--use-knowledge-base", "--kb",
         action="store_true",
         help="Use knowledgeBase.txt instead of the resume"
     )
+    parser.add_argument(
+        "--force-refresh",
+        action="store_true",
+        help="Re-parse the resume PDF instead of using the cached text"
+    )
+    parser.add_argument(
+        "--resume-pages",
+        type=positive_int,
+        default=4,
+        help="Maximum number of pages to read from the resume PDF, and from a PDF job description (default: 4)"
+    )
+    parser.add_argument(
+        "--jobs",
+        metavar="DIR",
+        help="Generate one cover letter per job description (*.txt) in DIR, concurrently"
+    )
+    parser.add_argument(
+        "--max-tokens-per-min",
+        type=positive_int,
+        help="Token budget per minute, requests wait instead of hitting rate limits"
+    )
+    parser.add_argument(
+        "--max-requests-per-min",
+        type=positive_int,
+        help="Request budget per minute, requests wait instead of hitting rate limits"
+    )
+    parser.add_argument(
+        "--max-concurrent",
+        type=positive_int,
+        default=5,
+        help="Maximum concurrent OpenAI requests in --jobs mode (default: 5)"
+    )
     
     args = parser.parse_args()
+    if args.jobs:
+        # Batch mode takes its job descriptions and output names from the files in --jobs
+        if args.job_description is not None:
+            parser.error("a job_description argument cannot be combined with --jobs")
+        if args.output:
+            parser.error("--output cannot be combined with --jobs, letters are named after their job files")
+    elif args.job_description is None:
+        args.job_description = "job_description.txt"
+    model = args.model or QUALITY_MODELS[args.quality]
+    # An --output name that is not a PDF/DOCX file asks for the text copy under that name
+    output_is_txt = bool(args.output) and not args.output.lower().endswith(('.pdf', '.docx', '.doc'))
+    write_txt = args.txt or output_is_txt or (args.no_pdf and args.no_docx)
     
     try:
         # Initialize the cover letter generator
-        generator = CoverLetterGenerator()
+        generator = CoverLetterGenerator(
+            force_refresh=args.force_refresh,
+            tokens_per_minute=args.max_tokens_per_min,
+            requests_per_minute=args.max_requests_per_min,
+            warm=not args.jobs,
+            max_pdf_pages=args.resume_pages
+        )
         
         # Create timestamped output directory
         output_dir = create_timestamped_directory()
@@ -201,62 +388,110 @@ def main():
             kb_path = "knowledgeBase.txt"
             if not os.path.isfile(kb_path):
                 raise FileNotFoundError(f"Knowledge base file not found: {kb_path}")
-            effective_resume = kb_path
+            effective_resume = Path(kb_path)
         else:
-            effective_resume = args.resume
+            effective_resume = as_input(args.resume)
         
-        # Generate the cover letter
-        cover_letter = generator.generate_with_ai(
-            resume=effective_resume,
-            job_description=args.job_description,
-            model=args.model
-        )
+        # Batch mode: one cover letter per job description file
+        if args.jobs:
+            failures = generate_batch(
+                generator,
+                effective_resume,
+                args.jobs,
+                output_dir,
+                model=model,
+                no_pdf=args.no_pdf,
+                no_docx=args.no_docx,
+                write_txt=write_txt,
+                max_concurrent_requests=args.max_concurrent
+            )
+            print(f"\n🎉 All files saved to: {output_dir}")
+            if failures:
+                print(f"\n{len(failures)} job description(s) failed:", file=sys.stderr)
+                for job_file, error in failures:
+                    print(f"  {job_file}: {error}", file=sys.stderr)
+                sys.exit(1)
+            return
         
-        # Output the result
-        if args.output:
-            # If custom output name provided, use it in the timestamped directory
-            txt_filename = os.path.join(output_dir, args.output)
-            with open(txt_filename, 'w') as f:
-                f.write(cover_letter)
-            print(f"Cover letter saved to {txt_filename}")
+        # Use custom output name if provided, otherwise the default, in the timestamped directory
+        output_name = os.path.splitext(args.output)[0] if args.output else "coverLetter"
+        if output_is_txt:
+            txt_filename = output_dir / args.output
         else:
-            # Create default output file in timestamped directory
-            txt_filename = os.path.join(output_dir, "coverLetter.txt")
-            with open(txt_filename, 'w') as f:
-                f.write(cover_letter)
-            print(f"Cover letter saved to {txt_filename}")
+            txt_filename = output_dir / f"{output_name}.txt"
         
-        # Generate PDF version
-        if not args.no_pdf:
-            print("\n" + "="*50)
-            print("GENERATING PDF VERSION")
-            print("="*50)
+        # Generate the cover letter, streaming it to the console (and txt file if requested) as it arrives
+        with open(txt_filename, 'w') if write_txt else contextlib.nullcontext() as f:
+            started = False
+            held = ""
             
-            if args.output:
-                pdf_filename = os.path.join(output_dir, args.output.replace('.txt', '.pdf').replace('.doc', '.pdf'))
-            else:
-                pdf_filename = os.path.join(output_dir, "coverLetter.pdf")
+            def write_delta(delta):
+                nonlocal started, held
+                sys.stdout.write(delta)
+                sys.stdout.flush()
+                if not f:
+                    return
+                
+                # Keep the file identical to the stripped letter: drop leading whitespace and
+                # hold back trailing whitespace until more text follows it
+                text = held + delta
+                if not started:
+                    text = text.lstrip()
+                    if not text:
+                        return
+                    started = True
+                body = text.rstrip()
+                held = text[len(body):]
+                f.write(body)
             
-            if create_pdf_cover_letter(cover_letter, pdf_filename):
-                print(f"✅ Beautiful PDF created: {pdf_filename}")
-            else:
-                print("❌ PDF generation failed")
+            cover_letter = generator.generate_with_ai(
+                resume=effective_resume,
+                job_description=as_input(args.job_description),
+                model=model,
+                on_delta=write_delta
+            )
+            print()
         
-        # Generate Pages document
-        print("\n" + "="*50)
-        print("GENERATING PAGES DOCUMENT")
-        print("="*50)
+        if write_txt:
+            print(f"Cover letter saved to {txt_filename}")
         
-        if args.output:
-            pages_filename = os.path.join(output_dir, args.output.replace('.txt', '.docx').replace('.pdf', '.docx'))
-        else:
-            pages_filename = os.path.join(output_dir, "coverLetter.docx")
+        pdf_filename = output_dir / f"{output_name}.pdf"
+        pages_filename = output_dir / f"{output_name}.docx"
         
-        if create_pages_document(cover_letter, pages_filename):
-            print(f"✅ Pages document created: {pages_filename}")
-            print("   (Open with Pages app or any Word-compatible application)")
-        else:
-            print("❌ Pages document generation failed")
+        # Segment the letter once for both renderers
+        segments = _segment(cover_letter)
+        
+        # Render the PDF and Pages documents concurrently, they are independent of each other
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            pdf_future = None
+            if not args.no_pdf:
+                pdf_future = executor.submit(create_pdf_cover_letter, cover_letter, pdf_filename, segments)
+            pages_future = None
+            if not args.no_docx:
+                pages_future = executor.submit(create_pages_document, cover_letter, pages_filename, segments)
+            
+            # Report PDF version
+            if pdf_future is not None:
+                print("\n" + "="*50)
+                print("GENERATING PDF VERSION")
+                print("="*50)
+                
+                if pdf_future.result():
+                    print(f"✅ Beautiful PDF created: {pdf_filename}")
+                else:
+                    print("❌ PDF generation failed")
+            
+            # Report Pages document
+            if pages_future is not None:
+                print("\n" + "="*50)
+                print("GENERATING PAGES DOCUMENT")
+                print("="*50)
+                
+                if pages_future.result():
+                    print(f"✅ Pages document created: {pages_filename}")
+                    print("   (Open with Pages app or any Word-compatible application)")
+                else:
+                    print("❌ Pages document generation failed")
         
         print(f"\n🎉 All files saved to: {output_dir}")
         
@@ -4,6 +4,7 @@ Test script to verify PDF reading functionality
 """
 
 import os
+from pathlib import Path
 from cover_letter_generator import CoverLetterGenerator
 
 def test_pdf_reading():
@@ -17,7 +18,7 @@ def test_pdf_reading():
         
         # Test reading the default resume PDF
         print("Testing PDF resume reading...")
-        resume_content = generator._read_file_or_text("Artin_Majd_CV.pdf")
+        resume_content = generator._read_file_or_text(Path("ArtinMajd_CV.pdf"))
         
         print(f"✅ Successfully read PDF resume")
         print(f"📄 Content length: {len(resume_content)} characters")
@@ -28,7 +29,7 @@ def test_pdf_reading():
         
         # Test reading the job description text file
         print("\nTesting text file reading...")
-        job_content = generator._read_file_or_text("job_description.txt")
+        job_content = generator._read_file_or_text(Path("job_description.txt"))
         
         print(f"✅ Successfully read job description")
         print(f"📄 Content length: {len(job_content)} characters")
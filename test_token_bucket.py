@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test script to verify TokenBucket refill and wait timing
+"""
+
+import asyncio
+import time
+from cover_letter_generator import TokenBucket
+
+def test_token_bucket():
+    """Test that the bucket refills over time and makes callers wait when empty."""
+    print("Testing TokenBucket...")
+    print("=" * 50)
+    
+    # 600 tokens per minute refills at 10 tokens per second
+    bucket = TokenBucket(600)
+    
+    # A full bucket hands out its budget without waiting
+    start = time.monotonic()
+    bucket.acquire(590)
+    assert time.monotonic() - start < 0.1, "full bucket should not wait"
+    print("✅ Full bucket grants tokens immediately")
+    
+    # 10 tokens are left, so 20 more need about one second of refill
+    start = time.monotonic()
+    bucket.acquire(20)
+    waited = time.monotonic() - start
+    assert 0.9 <= waited < 1.5, f"expected ~1s wait, waited {waited:.2f}s"
+    print(f"✅ Empty bucket waited {waited:.2f}s for refill")
+    
+    # The async variant waits the same way without blocking the event loop
+    start = time.monotonic()
+    asyncio.run(bucket.acquire_async(5))
+    waited = time.monotonic() - start
+    assert 0.4 <= waited < 1.0, f"expected ~0.5s wait, waited {waited:.2f}s"
+    print(f"✅ Async acquire waited {waited:.2f}s for refill")
+    
+    # A request larger than the whole budget only waits for a full bucket
+    small = TokenBucket(60)
+    start = time.monotonic()
+    small.acquire(1000)
+    assert time.monotonic() - start < 0.1, "oversized request should be clamped to capacity"
+    print("✅ Oversized request is clamped to the bucket capacity")
+    
+    # A budget below 1 is rejected
+    for invalid in (0, -5):
+        try:
+            TokenBucket(invalid)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"TokenBucket({invalid}) should raise ValueError")
+    print("✅ Invalid budgets are rejected")
+    
+    return True
+
+if __name__ == "__main__":
+    test_token_bucket()